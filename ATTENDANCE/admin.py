@@ -1,9 +1,15 @@
+import secrets
 import streamlit as st
-import pandas as pd
 from github import GithubException
 from .clients import create_supabase_client, create_github_repo
 from .config import get_env
-from .utils import current_date
+from .export import fetch_records, build_matrix, push_matrix
+from .clock import get_clock, timezone_names, DEFAULT_TIMEZONE
+from .summary import REBUILDS, is_rebuilding, start_rebuild_job
+from .scheduler import Scheduler, parse_time
+from .lifecycle import JOBS, is_deleting, start_delete_job
+from .cache import get_cache, OPEN_CLASSES, CLASS_SESSIONS
+from .ratelimit import get_counters
 from .logger import get_log
 
 logger =get_log(__name__)
@@ -22,6 +28,19 @@ def setup_clients():
     return supabase,repo, admin_user, admin_pass
 
 
+@st.cache_resource
+def get_scheduler():
+    """
+    One in-process scheduler per server process, only when
+    SCHEDULER_ENABLED is set. Returns None otherwise.
+    """
+    if str(get_env("SCHEDULER_ENABLED", "")).lower() not in ("1", "true", "yes"):
+        return None
+    scheduler = Scheduler.from_env()
+    scheduler.start_in_thread()
+    return scheduler
+
+
 #--------ADMIN LOGIN-----------
 def admin_login(admin_user, admin_pass):
     if "admin_logged_in" not in  st.session_state:
@@ -54,10 +73,11 @@ def sidebar_controls(supabase):
                     else:
                         supabase.table("classroom_settings").insert({
                             "class_name": class_input,
-                            "code": "1234",
+                            "code": f"{secrets.randbelow(10**6):06d}",
                             "daily_limit": 10,
                             "is_open": False
                         }).execute()
+                        get_cache().invalidate(OPEN_CLASSES, CLASS_SESSIONS)
                         st.success(f"Class '{class_input}' created.")
                         st.rerun()
 
@@ -66,16 +86,32 @@ def sidebar_controls(supabase):
                 st.rerun()
 
             st.markdown("## 🗑️ Delete Class")
-            delete_target = st.text_input("Enter class to delete")
+            delete_target = st.text_input("Enter class to delete").strip()
+            archive = st.checkbox("Archive history before deleting", value=True)
+            confirm = st.text_input("Type DELETE to confirm")
             if st.button("Delete This Class"):
-                if delete_target.strip():
-                    st.warning("This will permanently delete the class and all data.")
-                    if st.text_input("Type DELETE to confirm") == "DELETE":
-                        supabase.table("attendance").delete().eq("class_name", delete_target).execute()
-                        supabase.table("roll_map").delete().eq("class_name", delete_target).execute()
-                        supabase.table("classroom_settings").delete().eq("class_name", delete_target).execute()
-                        st.success("Class deleted.")
-                        st.rerun()
+                if not delete_target:
+                    st.warning("Enter a class name.")
+                elif confirm != "DELETE":
+                    st.warning("This will permanently delete the class and all data. Type DELETE to confirm.")
+                else:
+                    exists = supabase.table("classroom_settings").select("class_name").eq("class_name", delete_target).execute().data
+                    if not exists:
+                        st.warning("Class not found.")
+                    elif is_rebuilding(delete_target):
+                        st.warning("Wait for the summary rebuild of this class to finish.")
+                    else:
+                        start_delete_job(supabase, delete_target, archive=archive, scheduler=get_scheduler())
+                        st.success(f"Deleting '{delete_target}' in the background.")
+
+            for job in list(JOBS.values()):
+                st.progress(job.progress, text=f"{job.class_name}: {job.status} ({job.deleted}/{job.total})")
+                if job.archive_path:
+                    st.caption(f"Archive: `{job.archive_path}`")
+                if job.error:
+                    st.error(f"{job.class_name}: {job.error}")
+            if any(job.running for job in JOBS.values()):
+                st.button("🔄 Refresh progress")
     except Exception as e:
         logger.exception("Error in sidebar_controls")
         st.error(f"Sidebar error: {e}")
@@ -105,6 +141,7 @@ def class_controls(supabase):
 
     st.markdown(f"**Current Code:** `{config['code']}`")
     st.markdown(f"**Current Limit:** `{config['daily_limit']}`")
+    st.markdown(f"**Timezone:** `{config.get('timezone') or DEFAULT_TIMEZONE}`")
 
     is_open = config.get("is_open", False)
     other_open = [c["class_name"] for c in classes if c.get("is_open") and c["class_name"] != selected_class]
@@ -114,11 +151,14 @@ def class_controls(supabase):
     col1, col2 = st.columns(2)
     with col1:
         if st.button("✅ Open Attendance"):
-            if other_open:
+            if is_deleting(selected_class):
+                st.warning("This class is being deleted.")
+            elif other_open:
                 st.warning(f"Close other open classes: {', '.join(other_open)}")
             else:
                 try:
                     supabase.table("classroom_settings").update({"is_open": True}).eq("class_name", selected_class).execute()
+                    get_cache().invalidate(OPEN_CLASSES)
                     st.rerun()
                 except Exception:
                     logger.exception("Failed to open attendance")
@@ -127,45 +167,93 @@ def class_controls(supabase):
         if st.button("❌ Close Attendance"):
             try:
                 supabase.table("classroom_settings").update({"is_open": False}).eq("class_name", selected_class).execute()
+                get_cache().invalidate(OPEN_CLASSES)
                 st.rerun()
             except Exception:
                 logger.exception("Failed to close attendance")
                 st.error("Failed to close attendance.")
 
-    with st.expander("🔄 Update Code & Limit"):
+    with st.expander("🔄 Update Code, Limit & Timezone"):
         new_code = st.text_input("New Code", value=config["code"])
         new_limit = st.number_input("New Limit", min_value=1, value=config["daily_limit"], step=1)
+        zones = timezone_names()
+        current_zone = config.get("timezone") or DEFAULT_TIMEZONE
+        new_timezone = st.selectbox("Timezone", zones, index=zones.index(current_zone) if current_zone in zones else zones.index(DEFAULT_TIMEZONE))
         if st.button("📏 Save Settings"):
             try:
-                supabase.table("classroom_settings").update({"code": new_code, "daily_limit": new_limit}).eq("class_name", selected_class).execute()
+                supabase.table("classroom_settings").update({"code": new_code, "daily_limit": new_limit, "timezone": new_timezone}).eq("class_name", selected_class).execute()
+                get_cache().invalidate(OPEN_CLASSES)
                 st.success("✅ Settings updated.")
                 st.rerun()
             except Exception:
                 logger.exception("Failed to update settings")
                 st.error("Failed to update settings.")
 
-    return selected_class
+    with st.expander("⏰ Schedule"):
+        st.caption("Times are in the class timezone. Leave days empty to run every day.")
+        weekdays = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+        use_schedule = st.checkbox("Open/close automatically", value=bool(config.get("open_time")))
+        open_at = st.time_input("Open at", value=parse_time(config.get("open_time")) or parse_time("09:00"))
+        close_at = st.time_input("Close at", value=parse_time(config.get("close_time")) or parse_time("10:00"))
+        days = st.multiselect("Days", weekdays, default=[weekdays[d] for d in config.get("schedule_days") or []])
+        auto_snapshot = st.checkbox("Nightly snapshot & GitHub push", value=bool(config.get("auto_snapshot")))
+        if st.button("💾 Save Schedule"):
+            if is_deleting(selected_class):
+                st.warning("This class is being deleted.")
+            else:
+                try:
+                    supabase.table("classroom_settings").update({
+                        "open_time": open_at.strftime("%H:%M") if use_schedule else None,
+                        "close_time": close_at.strftime("%H:%M") if use_schedule else None,
+                        "schedule_days": [weekdays.index(d) for d in days],
+                        "auto_snapshot": auto_snapshot,
+                    }).eq("class_name", selected_class).execute()
+                    st.success("✅ Schedule saved.")
+                    st.rerun()
+                except Exception:
+                    logger.exception("Failed to save schedule")
+                    st.error("Failed to save schedule.")
+
+    with st.expander("🛡️ Submit Protection"):
+        st.caption("Student submits rejected before reaching the database. Shared across workers when CACHE_URL is set.")
+        try:
+            st.table([get_counters()])
+        except Exception:
+            logger.exception("Failed to read rate limit counters")
+            st.error("Failed to read counters.")
+
+    with st.expander("♻️ Attendance Summary"):
+        st.caption("Recompute the per-student summary used by the student view from raw attendance rows.")
+        if st.button("Rebuild Summary"):
+            if is_deleting(selected_class):
+                st.warning("This class is being deleted.")
+            else:
+                start_rebuild_job(supabase, selected_class, scheduler=get_scheduler())
+        job = REBUILDS.get(selected_class)
+        if job:
+            if job.status == "done":
+                st.success(f"✅ Summary rebuilt for {job.students} students.")
+            elif job.status == "failed":
+                st.error(f"Failed to rebuild summary: {job.error}")
+            else:
+                st.info("Rebuilding in the background…")
+                st.button("🔄 Refresh status")
+
+    return config
 
 
 
 # ---------- Attendance Matrix + Push ----------
-def show_matrix_and_push(supabase, repo, selected_class):
+def show_matrix_and_push(supabase, repo, selected_class, timezone_name=None):
     try:
-        records_resp = supabase.table("attendance").select("*").eq("class_name", selected_class).order("date", desc=True).execute()
-        records = records_resp.data
+        records = fetch_records(supabase, selected_class)
     except Exception:
         logger.exception("Failed to fetch attendance records")
         st.error("Failed to fetch attendance records.")
         return
 
     if records:
-        df = pd.DataFrame(records)
-        df["status"] = "P"
-        pivot_df = df.pivot_table(index=["roll_number", "name"], columns="date", values="status", aggfunc="first", fill_value="A").reset_index()
-        pivot_df["roll_number"] = pd.to_numeric(pivot_df["roll_number"], errors="coerce")
-        pivot_df = pivot_df.dropna(subset=["roll_number"])
-        pivot_df["roll_number"] = pivot_df["roll_number"].astype(int)
-        pivot_df = pivot_df.sort_values("roll_number")
+        pivot_df = build_matrix(records)
 
         def highlight(val):
             return "background-color:#d4edda;color:green" if val == "P" else "background-color:#f8d7da;color:red"
@@ -182,37 +270,16 @@ def show_matrix_and_push(supabase, repo, selected_class):
                 st.error("GitHub not configured. Cannot push file.")
                 return
 
-            filename = f"records/attendance_matrix_{selected_class}_{current_date().replace('-', '')}.csv"
-            file_content = pivot_df.to_csv(index=False)
-            commit_message = f"Push matrix for {selected_class}"
-            branch = "main"
-
             try:
-                existing_file = repo.get_contents(filename, ref=branch)
-                repo.update_file(
-                    path=filename,
-                    message=commit_message,
-                    content=file_content,
-                    sha=existing_file.sha,
-                    branch=branch
-                )
-                st.success(f"✅ Updated existing file: {filename}")
+                today = get_clock(timezone_name).today()
+                filename, created = push_matrix(repo, pivot_df, selected_class, today)
+                if created:
+                    st.success(f"✅ Created new file: {filename}")
+                else:
+                    st.success(f"✅ Updated existing file: {filename}")
             except GithubException as e:
-                try:
-                    if e.status == 404:
-                        repo.create_file(
-                            path=filename,
-                            message=commit_message,
-                            content=file_content,
-                            branch=branch
-                        )
-                        st.success(f"✅ Created new file: {filename}")
-                    else:
-                        logger.exception("GitHub exception")
-                        st.error(f"GitHub Error: {getattr(e, 'data', str(e))}")
-                except Exception:
-                    logger.exception("Failed to push to GitHub")
-                    st.error("Failed to push to GitHub.")
+                logger.exception("GitHub exception")
+                st.error(f"GitHub Error: {getattr(e, 'data', str(e))}")
             except Exception:
                 logger.exception("Failed to push file to GitHub")
                 st.error("Failed to push file to GitHub.")
@@ -234,8 +301,13 @@ def show_admin_panel():
         st.error("Failed to initialize clients. Check logs / environment.")
         return
 
+    try:
+        get_scheduler()
+    except Exception:
+        logger.exception("Failed to start scheduler")
+
     admin_login(admin_user, admin_pass)
     sidebar_controls(supabase)
-    selected_class = class_controls(supabase)
-    if selected_class:
-        show_matrix_and_push(supabase, repo, selected_class)
\ No newline at end of file
+    config = class_controls(supabase)
+    if config:
+        show_matrix_and_push(supabase, repo, config["class_name"], config.get("timezone"))
\ No newline at end of file
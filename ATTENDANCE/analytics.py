@@ -1,8 +1,8 @@
 # Attendence/analytics.py
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
 from .clients import create_supabase_client
+from .export import fetch_records, build_matrix
 from .logger import get_log
 
 logger = get_log(__name__)
@@ -31,7 +31,7 @@ def show_analytics_panel():
     selected_class = st.selectbox("Select Class", class_list)
 
     try:
-        data = supabase.table("attendance").select("*").eq("class_name", selected_class).execute().data
+        data = fetch_records(supabase, selected_class)
     except Exception:
         logger.exception("Failed to fetch attendance data")
         st.error("Failed to fetch attendance data.")
@@ -41,10 +41,7 @@ def show_analytics_panel():
         st.warning(f"No attendance data for class '{selected_class}'.")
         return
 
-    df = pd.DataFrame(data)
-    df["status"] = "P"
-    pivot_df = df.pivot_table(index=["roll_number", "name"], columns="date", values="status", aggfunc="first", fill_value="A").reset_index()
-    pivot_df.columns.name = None  # Remove column grouping name
+    pivot_df = build_matrix(data)
 
     st.dataframe(pivot_df, use_container_width="stretch")
 
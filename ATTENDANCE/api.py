@@ -0,0 +1,91 @@
+#Attendance/api.py
+
+"""
+Minimal JSON API worker for the student read path.
+
+Serves the same lookups the student page does on every rerun (open
+class settings and roll_map names) through the shared cache and
+Supabase, without a browser websocket session. The cluster runs these
+with --api and the load test drives them:
+
+    python -m ATTENDANCE.api --port 8600
+
+    GET /api/open_classes
+    GET /api/roll_map?class_name=<class>&roll_number=<roll>
+    GET /healthz
+"""
+
+import argparse
+import json
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from .clients import create_supabase_client
+from .student import load_open_classes, load_locked_name
+from .logger import get_log
+
+logger = get_log(__name__)
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs stall every keep-alive response by ~40ms
+    disable_nagle_algorithm = True
+    supabase = None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            if url.path == "/healthz":
+                self._send(200, {"status": "ok"})
+            elif url.path == "/api/open_classes":
+                classes = load_open_classes(self.supabase)
+                # never hand out attendance codes
+                self._send(200, {
+                    name: {"daily_limit": c["daily_limit"], "timezone": c.get("timezone")}
+                    for name, c in classes.items()
+                })
+            elif url.path == "/api/roll_map":
+                class_name = query.get("class_name", [""])[0]
+                roll_number = query.get("roll_number", [""])[0]
+                if not class_name or not roll_number.isdigit():
+                    self._send(400, {"error": "class_name and numeric roll_number are required"})
+                    return
+                self._send(200, {"name": load_locked_name(self.supabase, class_name, int(roll_number))})
+            else:
+                self._send(404, {"error": "not found"})
+        except Exception:
+            logger.exception(f"API request failed: {self.path}")
+            self._send(500, {"error": "internal error"})
+
+    def log_message(self, format, *args):
+        # per-request access logs would dominate a load test
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a JSON API worker for the student read path.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args(argv)
+
+    ApiHandler.supabase = create_supabase_client()
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    logger.info(f"API worker on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 import streamlit as st
-import supabase
 import pandas as pd
 from .logger import get_log
 from .clients import create_supabase_client
+from .summary import fetch_summary, decode_bits
+from .cache import get_cache, CLASS_SESSIONS
+from .clock import day_to_iso
 
 logger=get_log(__name__)
 
@@ -11,57 +13,56 @@ try:
 except Exception:
     supabase = None
 
+
+def load_class_sessions():
+    """
+    Returns {class_name: session_days}; cached so reruns of the
+    form don't re-query classroom_settings
+    """
+    def load():
+        rows = supabase.table("classroom_settings").select("class_name", "session_days").execute().data or []
+        return {entry["class_name"]: entry.get("session_days") or [] for entry in rows}
+
+    return get_cache().get_or_load(CLASS_SESSIONS, load, ttl=60)
+
+
 def show_attendance_panel():
     st.subheader("📅 Check Your Attendance Record")
 
-    with st.form("view_attendance_form"):
-        if supabase:
-            try:
-                class_rows = supabase.table("classroom_settings").select("class_name").execute().data or []
-                class_list = [entry["class_name"] for entry in class_rows]
-            except Exception:
-                class_list = []
-        else:
-            class_list = []
+    class_sessions = {}
+    if supabase:
+        try:
+            class_sessions = load_class_sessions()
+        except Exception:
+            logger.exception("Failed to fetch class list")
 
-        selected_class = st.selectbox("Select Your Class", class_list)
+    with st.form("view_attendance_form"):
+        selected_class = st.selectbox("Select Your Class", list(class_sessions))
         roll_number = st.text_input("Enter Your Roll Number").strip()
         submit = st.form_submit_button("🔍 Show My Attendance")
 
     if submit:
         if not roll_number:
             st.warning("Please enter your roll number.")
+        elif not roll_number.isdigit():
+            st.error("Roll number must be a number.")
         else:
             if not supabase:
                 st.error("Supabase client is not initialized.")
             else:
                 try:
-                    records = (
-                        supabase.table("attendance")
-                        .select("*")
-                        .eq("class_name", selected_class)
-                        .eq("roll_number", roll_number)
-                        .execute()
-                        .data
-                    )
+                    summary = fetch_summary(supabase, selected_class, int(roll_number))
                 except Exception:
-                    records = []
+                    logger.exception("Failed to fetch attendance summary")
+                    summary = None
 
-                if not records:
+                if not summary:
                     st.info("No attendance found for this roll number.")
                 else:
-                    df = pd.DataFrame(records)
-                    df["status"] = "P"
-
-                    matrix = df.pivot_table(
-                        index=["roll_number", "name"],
-                        columns="date",
-                        values="status",
-                        aggfunc="first",
-                        fill_value="A"
-                    ).reset_index()
-
-                    matrix.columns.name = None
-                    matrix = matrix.sort_values("roll_number")
+                    sessions = class_sessions.get(selected_class, [])
+                    row = {"roll_number": summary["roll_number"], "name": summary["name"]}
+                    row.update(zip(map(day_to_iso, sessions), decode_bits(summary["present_bits"], sessions)))
+                    matrix = pd.DataFrame([row])
 
                     st.dataframe(matrix, use_container_width="True")
+                    st.markdown(f"**Present:** `{summary['present_count']}` / `{len(sessions)}`")
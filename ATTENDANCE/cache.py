@@ -0,0 +1,237 @@
+#Attendance/cache.py
+
+"""
+Shared cache and coordination backend.
+
+Settings, roll_map lookups and rate limit counters go through one
+SharedCache per process. By default it is in-memory, which is fine for a
+single worker. Set CACHE_URL=redis://host:port/db to point every worker at
+the same Redis-compatible server (Redis, Valkey, KeyDB, ...): values and
+counters are then shared, and invalidations are broadcast over pub/sub so
+each worker also drops its short-lived local copy.
+"""
+
+import json
+import threading
+import time
+from .config import get_env
+from .logger import get_log
+
+logger = get_log(__name__)
+
+CHANNEL = "attendance:invalidate"
+
+# keys shared between the student, admin and scheduler processes
+OPEN_CLASSES = "open_classes"
+CLASS_SESSIONS = "class_sessions"
+
+
+def roll_map_key(class_name, roll_number):
+    return f"roll_map:{class_name}:{roll_number}"
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            value = (self._data.get(key, (0, None))[0] or 0) + amount
+            self._data[key] = (value, None)
+            return value
+
+    def publish(self, key):
+        for callback in self._listeners:
+            callback(key)
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+
+class RedisBackend:
+    def __init__(self, url):
+        import redis  # only needed when CACHE_URL is set
+        self._client = redis.Redis.from_url(url)
+        self._pubsub = None
+
+    def get(self, key):
+        raw = self._client.get(key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(key, json.dumps(value), ex=ttl)
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def incr(self, key, amount=1):
+        return self._client.incrby(key, amount)
+
+    def publish(self, key):
+        self._client.publish(CHANNEL, key)
+
+    def subscribe(self, callback):
+        def on_message(message):
+            data = message["data"]
+            callback(data.decode() if isinstance(data, bytes) else data)
+
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{CHANNEL: on_message})
+        self._pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+
+class SharedCache:
+    """
+    Read-through cache over a backend. With a remote backend a small
+    local copy (local_ttl seconds) saves a network hop per read; it is
+    dropped as soon as another worker publishes an invalidation.
+    Backend errors never reach callers: reads fall back to the loader,
+    and counters are kept locally and flushed in the background.
+    """
+
+    def __init__(self, backend, local_ttl=5, flush_seconds=2):
+        self.backend = backend
+        self.local = None if isinstance(backend, MemoryBackend) else MemoryBackend()
+        self.local_ttl = local_ttl
+        self.flush_seconds = flush_seconds
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flusher = None
+        backend.subscribe(self._on_invalidate)
+
+    def _on_invalidate(self, key):
+        if self.local is not None:
+            self.local.delete(key)
+
+    def get_or_load(self, key, loader, ttl):
+        """
+        Return the cached value for key, calling loader() on a miss.
+        Values must be JSON serializable.
+        """
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                return value
+
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            logger.warning(f"Cache read failed for {key}; loading directly", exc_info=True)
+            value = None
+        if value is None:
+            value = loader()
+            try:
+                self.backend.set(key, value, ttl)
+            except Exception:
+                logger.warning(f"Cache write failed for {key}", exc_info=True)
+
+        if self.local is not None:
+            self.local.set(key, value, min(ttl, self.local_ttl))
+        return value
+
+    def invalidate(self, *keys):
+        for key in keys:
+            if self.local is not None:
+                self.local.delete(key)
+            try:
+                self.backend.delete(key)
+                self.backend.publish(key)
+            except Exception:
+                logger.warning(f"Cache invalidation failed for {key}", exc_info=True)
+
+    # ---------- counters ----------
+    def incr(self, name, amount=1):
+        """
+        Count locally; a background thread adds the counts to the backend
+        """
+        if self.local is None:
+            self.backend.incr(f"counter:{name}", amount)
+            return
+        with self._pending_lock:
+            self._pending[name] = self._pending.get(name, 0) + amount
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="cache-counter-flush", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for name, amount in pending.items():
+            try:
+                self.backend.incr(f"counter:{name}", amount)
+            except Exception:
+                logger.warning(f"Counter flush failed for {name}", exc_info=True)
+                with self._pending_lock:
+                    self._pending[name] = self._pending.get(name, 0) + amount
+
+    def counter(self, name):
+        """
+        Shared total plus this worker's not yet flushed count
+        """
+        try:
+            shared = int(self.backend.get(f"counter:{name}") or 0)
+        except Exception:
+            logger.warning(f"Counter read failed for {name}", exc_info=True)
+            shared = 0
+        with self._pending_lock:
+            return shared + self._pending.get(name, 0)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_retry_at = None
+RETRY_SECONDS = 30
+
+
+def get_cache():
+    """
+    Returns the process wide SharedCache, built from CACHE_URL on first use.
+    If the shared backend can't be reached, falls back to an in-memory
+    cache and retries the shared one every RETRY_SECONDS.
+    """
+    global _cache, _retry_at
+    with _cache_lock:
+        url = get_env("CACHE_URL")
+        retry = url and _retry_at is not None and time.monotonic() >= _retry_at
+        if _cache is None or retry:
+            local_ttl = float(get_env("CACHE_LOCAL_TTL", 5))
+            if url:
+                try:
+                    _cache = SharedCache(RedisBackend(url), local_ttl=local_ttl)
+                    _retry_at = None
+                    logger.info("Using shared Redis cache backend")
+                except Exception:
+                    logger.exception("Shared cache unavailable; using in-memory cache")
+                    _retry_at = time.monotonic() + RETRY_SECONDS
+                    if _cache is None:
+                        _cache = SharedCache(MemoryBackend(), local_ttl=local_ttl)
+            else:
+                _cache = SharedCache(MemoryBackend(), local_ttl=local_ttl)
+        return _cache
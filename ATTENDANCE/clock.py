@@ -0,0 +1,91 @@
+#Attendance/clock.py
+
+"""
+Per-class clock and calendar.
+
+Attendance days are integer day ordinals (datetime.date.toordinal()) in
+the class's own timezone, so a session just after midnight IST counts
+for the IST day rather than the UTC one. Zone objects are cached and
+each clock keeps the UTC bounds of its current day, so asking for
+"today" is normally one comparison.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+from .logger import get_log
+
+logger = get_log(__name__)
+
+DEFAULT_TIMEZONE = "UTC"
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    """
+    Returns the ZoneInfo for name, falling back to UTC if unknown
+    """
+    try:
+        return ZoneInfo(name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone {name!r}; using {DEFAULT_TIMEZONE}")
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+@lru_cache(maxsize=1)
+def timezone_names():
+    return sorted(available_timezones())
+
+
+class ClassClock:
+    def __init__(self, timezone_name):
+        self.zone = get_zone(timezone_name)
+        # (start, end, day): UTC bounds of the current local day
+        self._window = None
+
+    def _roll(self, now):
+        local_day = now.astimezone(self.zone).date()
+        # day bounds come from local midnights so DST days are 23h/25h
+        start = datetime.combine(local_day, time(), tzinfo=self.zone).astimezone(timezone.utc)
+        end = datetime.combine(local_day + timedelta(days=1), time(), tzinfo=self.zone).astimezone(timezone.utc)
+        self._window = (start, end, local_day.toordinal())
+        return self._window
+
+    def today(self, now=None):
+        """
+        Returns the class's current day ordinal
+        """
+        now = now or datetime.now(timezone.utc)
+        window = self._window
+        if window is None or not (window[0] <= now < window[1]):
+            window = self._roll(now)
+        return window[2]
+
+    def localize(self, now=None):
+        """
+        Returns `now` (default: current time) as a datetime in the class timezone
+        """
+        return (now or datetime.now(timezone.utc)).astimezone(self.zone)
+
+
+@lru_cache(maxsize=256)
+def get_clock(timezone_name=DEFAULT_TIMEZONE):
+    """
+    Returns the shared ClassClock for a timezone; classes in the
+    same timezone share one clock
+    """
+    return ClassClock(timezone_name or DEFAULT_TIMEZONE)
+
+
+def day_to_iso(day):
+    """
+    738000 -> "2021-07-29"
+    """
+    return date.fromordinal(day).isoformat()
+
+
+def day_stamp(day):
+    """
+    738000 -> "20210729", used in export filenames
+    """
+    return date.fromordinal(day).strftime("%Y%m%d")
@@ -0,0 +1,147 @@
+#Attendance/cluster.py
+
+"""
+Multi-worker deployment mode.
+
+Starts several Streamlit workers (or JSON API workers with --api) on
+consecutive local ports and puts a small asyncio TCP load balancer in
+front of them:
+
+    python -m ATTENDANCE.cluster --app student_main.py --workers 4 --port 8501
+
+Each browser connection (HTTP or websocket) is pinned to one worker for
+its lifetime; new connections are spread round robin, or by client IP
+with --sticky so a reconnecting session lands on the same worker.
+Run with CACHE_URL set so settings, roll_map and counter caches stay
+coherent across workers.
+
+This is a plain TCP proxy: workers see 127.0.0.1 as every client's
+address and no X-Forwarded-For header, so nothing downstream may key
+on the client IP (the submit rate limits are per session).
+"""
+
+import argparse
+import asyncio
+import itertools
+import signal
+import subprocess
+import sys
+import zlib
+from .config import get_env
+from .logger import get_log
+
+logger = get_log(__name__)
+
+
+async def pipe(reader, writer):
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+        if writer.can_write_eof():
+            writer.write_eof()
+    except (ConnectionError, OSError):
+        pass
+
+
+class Balancer:
+    def __init__(self, backends, sticky=False):
+        self.backends = backends
+        self.sticky = sticky
+        self._next = itertools.count()
+
+    def _order(self, peer):
+        if self.sticky and peer:
+            start = zlib.crc32(peer[0].encode())
+        else:
+            start = next(self._next)
+        start %= len(self.backends)
+        return self.backends[start:] + self.backends[:start]
+
+    async def handle(self, client_reader, client_writer):
+        peer = client_writer.get_extra_info("peername")
+        # fall through to the next worker if one is down or restarting
+        for host, port in self._order(peer):
+            try:
+                upstream_reader, upstream_writer = await asyncio.open_connection(host, port)
+                break
+            except OSError:
+                continue
+        else:
+            logger.error("No worker available")
+            client_writer.close()
+            return
+
+        try:
+            await asyncio.gather(
+                pipe(client_reader, upstream_writer),
+                pipe(upstream_reader, client_writer),
+            )
+        finally:
+            upstream_writer.close()
+            client_writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        logger.info(f"Balancing {host}:{port} over {len(self.backends)} workers")
+        async with server:
+            await server.serve_forever()
+
+
+def start_workers(app, count, base_port, api=False):
+    """
+    Launch `count` headless Streamlit workers, or API workers when api
+    is set. Returns the Popen handles.
+    """
+    workers = []
+    for i in range(count):
+        port = str(base_port + i)
+        if api:
+            command = [sys.executable, "-m", "ATTENDANCE.api", "--port", port]
+        else:
+            command = [
+                sys.executable, "-m", "streamlit", "run", app,
+                "--server.port", port,
+                "--server.address", "127.0.0.1",
+                "--server.headless", "true",
+            ]
+        workers.append(subprocess.Popen(command))
+    return workers
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several Streamlit workers behind a local load balancer.")
+    parser.add_argument("--app", default="student_main.py")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8501)
+    parser.add_argument("--worker-port", type=int, default=8600, help="first worker port")
+    parser.add_argument("--sticky", action="store_true", help="pin clients to a worker by IP")
+    parser.add_argument("--api", action="store_true", help="run JSON API workers instead of Streamlit")
+    args = parser.parse_args(argv)
+
+    if args.workers > 1 and not get_env("CACHE_URL"):
+        logger.warning("CACHE_URL is not set; each worker keeps its own cache and counters.")
+
+    # SIGTERM (e.g. from the load test or a process manager) must also
+    # reach the cleanup below, or the workers outlive the balancer
+    signal.signal(signal.SIGTERM, _interrupt)
+    workers = start_workers(args.app, args.workers, args.worker_port, api=args.api)
+    backends = [("127.0.0.1", args.worker_port + i) for i in range(args.workers)]
+    try:
+        asyncio.run(Balancer(backends, sticky=args.sticky).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#Attendance/export.py
+
+"""
+Attendance matrix building and export helpers shared by the
+admin panel and the scheduler's snapshot jobs.
+"""
+
+import os
+import pandas as pd
+from github import GithubException
+from .clock import day_to_iso, day_stamp
+from .lifecycle import iter_batches
+from .logger import get_log
+
+logger = get_log(__name__)
+
+RECORDS_DIR = "records"
+
+
+def fetch_records(supabase, class_name):
+    """
+    Returns raw attendance rows of a class, oldest first. Paged, so large
+    classes aren't cut off at PostgREST's max-rows.
+    """
+    return [row for rows in iter_batches(supabase, class_name) for row in rows]
+
+
+def build_matrix(records):
+    """
+    Pivot raw attendance rows into a roll x day P/A matrix.
+    Columns are pivoted on the integer day and labelled as ISO dates.
+    """
+    df = pd.DataFrame(records)
+    df["status"] = "P"
+    pivot_df = df.pivot_table(index=["roll_number", "name"], columns="day", values="status", aggfunc="first", fill_value="A")
+    pivot_df = pivot_df.rename(columns=lambda day: day_to_iso(int(day))).reset_index()
+    pivot_df.columns.name = None
+    pivot_df["roll_number"] = pd.to_numeric(pivot_df["roll_number"], errors="coerce")
+    pivot_df = pivot_df.dropna(subset=["roll_number"])
+    pivot_df["roll_number"] = pivot_df["roll_number"].astype(int)
+    return pivot_df.sort_values("roll_number")
+
+
+def matrix_filename(class_name, day):
+    return f"{RECORDS_DIR}/attendance_matrix_{class_name}_{day_stamp(day)}.csv"
+
+
+def export_matrix(pivot_df, class_name, day):
+    """
+    Write the matrix for `day` to the local records folder. Returns the path.
+    """
+    filename = matrix_filename(class_name, day)
+    os.makedirs(RECORDS_DIR, exist_ok=True)
+    pivot_df.to_csv(filename, index=False)
+    return filename
+
+
+def push_matrix(repo, pivot_df, class_name, day, branch="main"):
+    """
+    Create or update the matrix file for `day` in the GitHub repo.
+    Returns (filename, created). GitHub errors are raised to the caller.
+    """
+    filename = matrix_filename(class_name, day)
+    file_content = pivot_df.to_csv(index=False)
+    commit_message = f"Push matrix for {class_name}"
+
+    try:
+        existing_file = repo.get_contents(filename, ref=branch)
+    except GithubException as e:
+        if e.status != 404:
+            raise
+        repo.create_file(
+            path=filename,
+            message=commit_message,
+            content=file_content,
+            branch=branch
+        )
+        return filename, True
+
+    repo.update_file(
+        path=filename,
+        message=commit_message,
+        content=file_content,
+        sha=existing_file.sha,
+        branch=branch
+    )
+    return filename, False
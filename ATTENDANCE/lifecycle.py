@@ -0,0 +1,236 @@
+#Attendance/lifecycle.py
+
+"""
+Class archival and deletion.
+
+A class is archived to a compressed parquet file and then deleted in
+bounded batches from a background job, so removing a large class never
+blocks the admin UI or holds a long lock on the attendance table.
+Child rows go first and classroom_settings last, which means a job that
+dies halfway leaves a class that is still listed and can be deleted
+again rather than orphan rows.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .cache import get_cache, OPEN_CLASSES, CLASS_SESSIONS
+from .logger import get_log
+
+logger = get_log(__name__)
+
+ARCHIVE_DIR = "archives"
+BATCH_SIZE = 500
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("class_name", pa.string()),
+    ("roll_number", pa.int64()),
+    ("name", pa.string()),
+    ("day", pa.int64()),
+    ("date", pa.string()),
+])
+
+# class_name -> DeletionJob, shared by every session in this process
+JOBS = {}
+_jobs_lock = threading.Lock()
+
+
+@dataclass
+class DeletionJob:
+    class_name: str
+    status: str = "pending"
+    total: int = 0
+    deleted: int = 0
+    archive_path: str | None = None
+    error: str | None = None
+
+    @property
+    def progress(self):
+        if self.status == "done":
+            return 1.0
+        return min(self.deleted / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def running(self):
+        return self.status not in ("done", "failed")
+
+
+def count_rows(supabase, class_name):
+    resp = (
+        supabase.table("attendance")
+        .select("day", count="exact")
+        .eq("class_name", class_name)
+        .limit(1)
+        .execute()
+    )
+    return resp.count or 0
+
+
+def iter_batches(supabase, class_name, batch_size=BATCH_SIZE):
+    """
+    Yield the class's attendance rows a page at a time, keyset paged on
+    (day, roll_number) so each page is an index range scan, not an OFFSET
+    """
+    after = None
+    while True:
+        query = (
+            supabase.table("attendance")
+            .select("*")
+            .eq("class_name", class_name)
+        )
+        if after is not None:
+            day, roll = after
+            query = query.or_(f"day.gt.{day},and(day.eq.{day},roll_number.gt.{roll})")
+        rows = (
+            query.order("day")
+            .order("roll_number")
+            .limit(batch_size)
+            .execute()
+            .data
+        ) or []
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        after = (rows[-1]["day"], rows[-1]["roll_number"])
+
+
+def archive_class(supabase, class_name, batch_size=BATCH_SIZE):
+    """
+    Stream the class's attendance history to archives/ as zstd parquet,
+    one row group per batch. Returns (path, rows) or (None, 0) when
+    there is nothing to archive.
+    """
+    writer = None
+    path = None
+    total = 0
+    try:
+        for rows in iter_batches(supabase, class_name, batch_size):
+            if writer is None:
+                os.makedirs(ARCHIVE_DIR, exist_ok=True)
+                stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+                path = os.path.join(ARCHIVE_DIR, f"{class_name}_{stamp}.parquet")
+                writer = pq.ParquetWriter(path, ARCHIVE_SCHEMA, compression="zstd")
+            batch = [{field: r.get(field) for field in ARCHIVE_SCHEMA.names} for r in rows]
+            writer.write_table(pa.Table.from_pylist(batch, schema=ARCHIVE_SCHEMA))
+            total += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if path:
+        logger.info(f"Archived {total} rows of {class_name} to {path}")
+    return path, total
+
+
+def delete_attendance(supabase, class_name, job, batch_size=BATCH_SIZE):
+    """
+    Delete attendance rows by primary key, at most batch_size per round.
+    Fails if a round deletes nothing (e.g. an RLS policy blocks deletes)
+    instead of selecting the same page forever.
+    """
+    while True:
+        rows = (
+            supabase.table("attendance")
+            .select("roll_number", "day")
+            .eq("class_name", class_name)
+            .order("day")
+            .order("roll_number")
+            .limit(batch_size)
+            .execute()
+            .data
+        ) or []
+        if not rows:
+            return
+
+        by_day = {}
+        for r in rows:
+            by_day.setdefault(r["day"], []).append(r["roll_number"])
+        deleted = 0
+        for day, rolls in by_day.items():
+            resp = (
+                supabase.table("attendance")
+                .delete()
+                .eq("class_name", class_name)
+                .eq("day", day)
+                .in_("roll_number", rolls)
+                .execute()
+            )
+            deleted += len(resp.data or [])
+        if not deleted:
+            raise RuntimeError(f"No attendance rows deleted for {class_name}; check delete permissions.")
+        job.deleted += deleted
+
+
+def run_delete_job(supabase, job, archive=True, batch_size=BATCH_SIZE):
+    class_name = job.class_name
+    try:
+        # stop new submissions while the rows are going away, and clear the
+        # timetable so a scheduler in another process can't reopen the class
+        supabase.table("classroom_settings").update({
+            "is_open": False,
+            "open_time": None,
+            "close_time": None,
+        }).eq("class_name", class_name).execute()
+        get_cache().invalidate(OPEN_CLASSES)
+        job.total = count_rows(supabase, class_name)
+
+        if archive:
+            job.status = "archiving"
+            job.archive_path, _ = archive_class(supabase, class_name, batch_size)
+
+        job.status = "deleting"
+        delete_attendance(supabase, class_name, job, batch_size)
+        supabase.table("attendance_summary").delete().eq("class_name", class_name).execute()
+        supabase.table("roll_map").delete().eq("class_name", class_name).execute()
+        supabase.table("classroom_settings").delete().eq("class_name", class_name).execute()
+        get_cache().invalidate(OPEN_CLASSES, CLASS_SESSIONS)
+        job.status = "done"
+        logger.info(f"Deleted class {class_name} ({job.deleted} attendance rows)")
+    except Exception as e:
+        logger.exception(f"Failed to delete class {class_name}")
+        job.status = "failed"
+        job.error = str(e)
+    return job
+
+
+def is_deleting(class_name):
+    """
+    True while a deletion job for class_name is running in this process.
+    Nothing may open the class then, or new rows would outlive the job.
+    """
+    with _jobs_lock:
+        job = JOBS.get(class_name)
+        return job is not None and job.running
+
+
+def start_delete_job(supabase, class_name, archive=True, scheduler=None):
+    """
+    Start deleting a class in the background and return its DeletionJob.
+    Runs on the scheduler's job pool when one is given, else on a thread.
+    An already running job for the same class is returned as is.
+    """
+    with _jobs_lock:
+        job = JOBS.get(class_name)
+        if job and job.running:
+            return job
+        job = DeletionJob(class_name)
+        JOBS[class_name] = job
+
+    run_in_background(run_delete_job, (supabase, job, archive), f"delete-{class_name}", scheduler)
+    return job
+
+
+def run_in_background(fn, args, name, scheduler=None):
+    """
+    Run fn(*args) on the scheduler's job pool when one is given,
+    else on a daemon thread called `name`
+    """
+    if scheduler is not None:
+        scheduler.submit(fn, *args)
+    else:
+        threading.Thread(target=fn, args=args, name=name, daemon=True).start()
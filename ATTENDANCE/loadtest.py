@@ -0,0 +1,167 @@
+#Attendance/loadtest.py
+
+"""
+Throughput load test for the multi-worker mode.
+
+For each worker count, starts `python -m ATTENDANCE.cluster`, waits for
+every worker and the balancer to answer, then drives it with keep-alive
+HTTP clients for a fixed duration and reports requests per second:
+
+    python -m ATTENDANCE.loadtest --workers 1 2 4 --duration 15 --class-name Demo
+
+The default --mode api runs JSON API workers (ATTENDANCE/api.py) and
+mixes open-class settings and roll_map lookups, i.e. the cache and
+Supabase work the student page does on every rerun. --mode streamlit
+measures Streamlit page loads instead, which never runs the app script.
+--direct spreads clients over the worker ports and skips the balancer,
+to tell worker scaling apart from the single-threaded proxy's limit.
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+HEALTH = {"api": "/healthz", "streamlit": "/_stcore/health"}
+
+
+async def fetch(reader, writer, host, path):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    body = await reader.readexactly(length)
+    return status, body
+
+
+async def client(host, port, paths, offset, deadline, stats):
+    reader = writer = None
+    i = offset
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            status, _ = await fetch(reader, writer, host, paths[i % len(paths)])
+            stats["ok" if status == 200 else "error"] += 1
+            i += 1
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            stats["error"] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def drive(host, ports, paths, concurrency, duration):
+    stats = {"ok": 0, "error": 0}
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(
+        client(host, ports[i % len(ports)], paths, i, deadline, stats)
+        for i in range(concurrency)
+    ))
+    return stats
+
+
+async def get(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return await fetch(reader, writer, host, path)
+    finally:
+        writer.close()
+
+
+async def wait_ready(host, port, path, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status, _ = await get(host, port, path)
+            if status == 200:
+                return True
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            pass
+        await asyncio.sleep(1)
+    return False
+
+
+def request_paths(args):
+    if args.mode == "streamlit":
+        return ["/"]
+
+    paths = ["/api/open_classes"]
+    class_name = args.class_name
+    if not class_name:
+        _, body = asyncio.run(get("127.0.0.1", args.port, "/api/open_classes"))
+        open_classes = list(json.loads(body))
+        class_name = open_classes[0] if open_classes else None
+    if class_name:
+        paths += [
+            "/api/roll_map?" + urlencode({"class_name": class_name, "roll_number": roll})
+            for roll in range(1, args.rolls + 1)
+        ]
+    return paths
+
+
+def run_once(args, workers):
+    command = [
+        sys.executable, "-m", "ATTENDANCE.cluster",
+        "--app", args.app,
+        "--workers", str(workers),
+        "--host", "127.0.0.1",
+        "--port", str(args.port),
+        "--worker-port", str(args.worker_port),
+    ]
+    if args.mode == "api":
+        command.append("--api")
+    cluster = subprocess.Popen(command)
+    health = HEALTH[args.mode]
+    worker_ports = [args.worker_port + i for i in range(workers)]
+    try:
+        # every worker must be up, not just the first one to answer
+        for port in worker_ports:
+            if not asyncio.run(wait_ready("127.0.0.1", port, health)):
+                raise RuntimeError(f"worker on port {port} did not start")
+        if not asyncio.run(wait_ready("127.0.0.1", args.port, health)):
+            raise RuntimeError("balancer did not start")
+
+        paths = request_paths(args)
+        ports = worker_ports if args.direct else [args.port]
+        asyncio.run(drive("127.0.0.1", ports, paths, args.concurrency, 2))  # warm up caches
+        return asyncio.run(drive("127.0.0.1", ports, paths, args.concurrency, args.duration))
+    finally:
+        cluster.terminate()
+        cluster.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure throughput scaling with worker count.")
+    parser.add_argument("--mode", choices=["api", "streamlit"], default="api")
+    parser.add_argument("--app", default="student_main.py")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--worker-port", type=int, default=8710)
+    parser.add_argument("--class-name", help="class for roll_map lookups (default: first open class)")
+    parser.add_argument("--rolls", type=int, default=50, help="distinct roll numbers to look up")
+    parser.add_argument("--direct", action="store_true", help="connect to workers directly, bypassing the balancer")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15)
+    args = parser.parse_args(argv)
+
+    print(f"{'workers':>8} {'req/s':>10} {'errors':>8} {'scaling':>8}")
+    baseline = None
+    for workers in args.workers:
+        stats = run_once(args, workers)
+        rate = stats["ok"] / args.duration
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>10.1f} {stats['error']:>8} {rate / baseline if baseline else 0:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
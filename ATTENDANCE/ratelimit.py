@@ -0,0 +1,136 @@
+#Attendance/ratelimit.py
+
+"""
+In-process token bucket rate limiting for the student submit path.
+Rejections are counted so bad traffic can be watched without it ever
+reaching Supabase. Buckets are per worker; the counters live in the
+shared cache so they add up across workers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from .cache import get_cache
+from .config import get_env
+
+
+class TokenBucket:
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now=None):
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def empty(self, now=None):
+        self._refill(now)
+        return self.tokens < 1
+
+    def allow(self, cost=1, now=None):
+        self._refill(now)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+
+class RateLimiter:
+    """
+    One TokenBucket per key. Least recently used keys are dropped past
+    max_keys so a flood of new clients can't grow memory without bound.
+    """
+
+    def __init__(self, capacity, refill_per_second, max_keys=10000):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, key):
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            bucket = TokenBucket(self.capacity, self.refill_per_second)
+        self._buckets[key] = bucket
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return bucket
+
+    def allow(self, key, cost=1):
+        with self._lock:
+            return self._bucket(key).allow(cost)
+
+    def exhausted(self, key):
+        """
+        True if key has no token left, without spending one
+        """
+        with self._lock:
+            bucket = self._buckets.get(key)
+            return bucket is not None and bucket.empty()
+
+
+# ---------- counters ----------
+COUNTERS = ("rejected_client", "rejected_class", "rejected_guess", "bad_code")
+
+
+def increment(name):
+    """
+    Count a rejection. Local only; the shared cache flushes it later,
+    so rejecting stays off the network.
+    """
+    get_cache().incr(name)
+
+
+def get_counters():
+    """
+    Returns the rejection counters, e.g.
+    {"rejected_client": 3, "rejected_class": 0, "rejected_guess": 0, "bad_code": 12}
+    """
+    cache = get_cache()
+    return {name: cache.counter(name) for name in COUNTERS}
+
+
+# ---------- submit path limiters ----------
+# per client session: a small burst, then one attempt every 10 seconds
+client_limiter = RateLimiter(
+    capacity=int(get_env("SUBMIT_CLIENT_BURST", 5)),
+    refill_per_second=float(get_env("SUBMIT_CLIENT_RATE", 0.1)),
+)
+# per class: caps what one class can push at the database
+class_limiter = RateLimiter(
+    capacity=int(get_env("SUBMIT_CLASS_BURST", 60)),
+    refill_per_second=float(get_env("SUBMIT_CLASS_RATE", 20)),
+)
+# per class, charged only by wrong codes: once spent, every code check
+# for the class is refused until it refills, so fresh sessions can't
+# brute force the code (default: 20, then one guess every 20 seconds)
+guess_limiter = RateLimiter(
+    capacity=int(get_env("SUBMIT_GUESS_BURST", 20)),
+    refill_per_second=float(get_env("SUBMIT_GUESS_RATE", 0.05)),
+)
+
+
+def check_submit(client_key, class_name, code_ok):
+    """
+    Returns None if the submit may proceed, else the counter name of
+    the limit or check that rejected it. Wrong codes only spend the
+    guess budget, never the class budget legitimate submits rely on.
+    """
+    if not client_limiter.allow(client_key):
+        increment("rejected_client")
+        return "rejected_client"
+    if guess_limiter.exhausted(class_name):
+        increment("rejected_guess")
+        return "rejected_guess"
+    if not code_ok:
+        guess_limiter.allow(class_name)
+        increment("bad_code")
+        return "bad_code"
+    if not class_limiter.allow(class_name):
+        increment("rejected_class")
+        return "rejected_class"
+    return None
@@ -0,0 +1,204 @@
+#Attendance/scheduler.py
+
+"""
+In-process asyncio scheduler.
+
+Opens and closes classes from the timetable stored on
+classroom_settings (open_time, close_time, schedule_days, read in the
+class's timezone) and runs the nightly matrix snapshot/export jobs off
+the request path.
+Snapshot jobs are jittered and capped by a semaphore so many classes
+don't hit Supabase and GitHub at the same instant.
+
+Run standalone with `python -m ATTENDANCE.scheduler`, or let the admin
+panel start it in-process by setting SCHEDULER_ENABLED=true.
+"""
+
+import asyncio
+import random
+import threading
+from datetime import datetime, time, timezone
+from .cache import get_cache, OPEN_CLASSES
+from .clients import create_supabase_client, create_github_repo
+from .clock import get_clock
+from .config import get_env
+from .export import fetch_records, build_matrix, export_matrix, push_matrix
+from .lifecycle import is_deleting
+from .logger import get_log
+
+logger = get_log(__name__)
+
+
+def parse_time(value):
+    """
+    Parse "HH:MM" (or "HH:MM:SS") into a time, None if empty
+    """
+    if not value:
+        return None
+    return time.fromisoformat(value)
+
+
+def crossed(at, last, now):
+    """
+    True if the wall clock time `at` fell in (last, now]
+    """
+    for day in {last.date(), now.date()}:
+        moment = datetime.combine(day, at, tzinfo=now.tzinfo)
+        if last < moment <= now:
+            return True
+    return False
+
+
+def runs_today(config, now):
+    days = config.get("schedule_days")
+    return not days or now.weekday() in days
+
+
+class Scheduler:
+    def __init__(self, supabase, repo=None, tick_seconds=60, snapshot_time=time(23, 30),
+                 max_concurrency=3, jitter_seconds=120):
+        self.supabase = supabase
+        self.repo = repo
+        self.tick_seconds = tick_seconds
+        self.snapshot_time = snapshot_time
+        self.jitter_seconds = jitter_seconds
+        self.max_concurrency = max_concurrency
+        self.loop = None
+        self._semaphore = None
+        self._ready = threading.Event()
+        self._tasks = set()
+
+    @classmethod
+    def from_env(cls):
+        supabase = create_supabase_client()
+        gh, repo = create_github_repo()
+        return cls(
+            supabase,
+            repo,
+            tick_seconds=int(get_env("SCHEDULER_TICK_SECONDS", 60)),
+            snapshot_time=parse_time(get_env("SNAPSHOT_TIME", "23:30")),
+            max_concurrency=int(get_env("SCHEDULER_MAX_CONCURRENCY", 3)),
+            jitter_seconds=int(get_env("SCHEDULER_JITTER_SECONDS", 120)),
+        )
+
+    # ---------- loop ----------
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._ready.set()
+        last = datetime.now(timezone.utc)
+        logger.info("Scheduler started")
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            now = datetime.now(timezone.utc)
+            try:
+                await self.tick(last, now)
+            except Exception:
+                # keep `last` so the next tick retries the whole window
+                # instead of dropping any open/close/snapshot time in it
+                logger.exception("Scheduler tick failed")
+                continue
+            last = now
+
+    async def tick(self, last, now):
+        classes = await asyncio.to_thread(self._fetch_classes)
+        await self.apply_timetable(classes, last, now)
+        if not self.snapshot_time:
+            return
+        for config in classes:
+            clock = get_clock(config.get("timezone"))
+            if config.get("auto_snapshot") and crossed(self.snapshot_time, clock.localize(last), clock.localize(now)):
+                # run detached so slow pushes don't delay the next timetable tick
+                task = asyncio.create_task(self.snapshot(config["class_name"], clock.today(now)))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    def start_in_thread(self):
+        """
+        Run the scheduler on its own event loop in a daemon thread
+        """
+        thread = threading.Thread(target=asyncio.run, args=(self.run(),), name="attendance-scheduler", daemon=True)
+        thread.start()
+        self._ready.wait(timeout=5)
+        return thread
+
+    def submit(self, fn, *args):
+        """
+        Run a blocking fn(*args) as a background job on the scheduler's
+        loop, under the same concurrency cap. Returns a concurrent Future.
+        """
+        if self.loop is None:
+            raise RuntimeError("Scheduler is not running.")
+        return asyncio.run_coroutine_threadsafe(self._job(fn, *args), self.loop)
+
+    async def _job(self, fn, *args):
+        async with self._semaphore:
+            return await asyncio.to_thread(fn, *args)
+
+    # ---------- timetable ----------
+    def _fetch_classes(self):
+        return self.supabase.table("classroom_settings").select("*").execute().data or []
+
+    def _set_open(self, class_name, is_open):
+        self.supabase.table("classroom_settings").update({"is_open": is_open}).eq("class_name", class_name).execute()
+        get_cache().invalidate(OPEN_CLASSES)
+
+    async def apply_timetable(self, classes, last, now):
+        open_now = {c["class_name"] for c in classes if c.get("is_open")}
+        due_close, due_open = [], []
+        for config in classes:
+            clock = get_clock(config.get("timezone"))
+            local_last, local_now = clock.localize(last), clock.localize(now)
+            if not runs_today(config, local_now):
+                continue
+            close_at = parse_time(config.get("close_time"))
+            open_at = parse_time(config.get("open_time"))
+            if close_at and crossed(close_at, local_last, local_now):
+                due_close.append(config["class_name"])
+            if open_at and crossed(open_at, local_last, local_now):
+                due_open.append(config["class_name"])
+
+        # all closes before any open, so back-to-back classes (A closes
+        # when B opens) hand over regardless of row order
+        for name in due_close:
+            if name in open_now:
+                await asyncio.to_thread(self._set_open, name, False)
+                open_now.discard(name)
+                logger.info(f"Scheduled close: {name}")
+
+        for name in due_open:
+            if name in open_now:
+                continue
+            if is_deleting(name):
+                logger.warning(f"Skipped scheduled open of {name}; it is being deleted")
+                continue
+            # same rule as the admin panel: one open class at a time
+            if open_now:
+                logger.warning(f"Skipped scheduled open of {name}; already open: {', '.join(open_now)}")
+                continue
+            await asyncio.to_thread(self._set_open, name, True)
+            open_now.add(name)
+            logger.info(f"Scheduled open: {name}")
+
+    # ---------- snapshots ----------
+    async def snapshot(self, class_name, day):
+        await asyncio.sleep(random.uniform(0, self.jitter_seconds))
+        try:
+            await self._job(self._snapshot, class_name, day)
+        except Exception:
+            logger.exception(f"Snapshot failed for {class_name}")
+
+    def _snapshot(self, class_name, day):
+        records = fetch_records(self.supabase, class_name)
+        if not records:
+            return
+        pivot_df = build_matrix(records)
+        path = export_matrix(pivot_df, class_name, day)
+        logger.info(f"Exported snapshot {path}")
+        if self.repo is not None:
+            filename, _ = push_matrix(self.repo, pivot_df, class_name, day)
+            logger.info(f"Pushed snapshot {filename}")
+
+
+if __name__ == "__main__":
+    asyncio.run(Scheduler.from_env().run())
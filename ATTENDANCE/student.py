@@ -1,14 +1,66 @@
+import secrets
+import uuid
 import streamlit as st
 from supabase import Client
 from .clients import create_supabase_client
-from .utils import current_date
+from .clock import get_clock, day_to_iso
+from .summary import record_submission
+from .ratelimit import check_submit
+from .cache import get_cache, OPEN_CLASSES, roll_map_key
 from .logger import get_log
 
 logger=get_log(__name__)
 
-def show_student_panel():
-    IST = None  # preserved variable name usage in old code
 
+def load_open_classes(supabase):
+    """
+    Returns {class_name: {"code", "daily_limit", "timezone"}} for open classes.
+    Cached briefly so reruns and the code check don't query Supabase.
+    """
+    def load():
+        rows = (
+            supabase.table("classroom_settings")
+            .select("class_name", "code", "daily_limit", "timezone")
+            .eq("is_open", True)
+            .execute()
+            .data
+        ) or []
+        return {
+            r["class_name"]: {"code": r["code"], "daily_limit": r["daily_limit"], "timezone": r.get("timezone")}
+            for r in rows
+        }
+
+    return get_cache().get_or_load(OPEN_CLASSES, load, ttl=10)
+
+
+def load_locked_name(supabase, class_name, roll_number):
+    """
+    Returns the name locked to this roll number, or None
+    """
+    def load():
+        rows = (
+            supabase.table("roll_map")
+            .select("name")
+            .eq("class_name", class_name)
+            .eq("roll_number", roll_number)
+            .execute()
+            .data
+        )
+        return {"name": rows[0]["name"] if rows else None}
+
+    return get_cache().get_or_load(roll_map_key(class_name, roll_number), load, ttl=60)["name"]
+
+
+def client_key():
+    """
+    Rate limit key: a per-session id. Not the client IP, since a whole
+    classroom usually shares one NAT address.
+    """
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = uuid.uuid4().hex
+    return st.session_state.client_id
+
+def show_student_panel():
     # Create supabase client
     try:
         supabase: Client = create_supabase_client()
@@ -19,42 +71,21 @@ def show_student_panel():
     st.title("Student Attendance Portal")
 
     try:
-        open_classes_response = (
-            supabase.table("classroom_settings")
-            .select("class_name")
-            .eq("is_open", True)
-            .execute()
-        )
-        class_list = (
-            [entry["class_name"] for entry in open_classes_response.data]
-            if open_classes_response and open_classes_response.data
-            else []
-        )
+        open_classes = load_open_classes(supabase)
     except Exception:
         logger.exception("Failed to fetch open classes")
         st.error("Failed to fetch classes.")
         return
 
-    if not class_list:
+    if not open_classes:
         st.warning(" No classrooms are currently open for attendance.")
         st.stop()
 
-    selected_class = st.selectbox("Select Your Class", class_list)
-
-    try:
-        settings_response = (
-            supabase.table("classroom_settings")
-            .select("code", "daily_limit")
-            .eq("class_name", selected_class)
-            .execute()
-        )
-        settings = settings_response.data[0]
-        required_code = settings["code"]
-        daily_limit = settings["daily_limit"]
-    except Exception:
-        logger.exception("Failed to fetch class settings")
-        st.error("Failed to fetch class settings.")
-        return
+    selected_class = st.selectbox("Select Your Class", list(open_classes))
+    settings = open_classes[selected_class]
+    required_code = settings["code"]
+    daily_limit = settings["daily_limit"]
+    clock = get_clock(settings.get("timezone"))
 
     roll_number_raw = st.text_input("Roll Number").strip()
 
@@ -72,20 +103,13 @@ def show_student_panel():
 
     # fetch roll_map
     try:
-        roll_map_response = (
-            supabase.table("roll_map")
-            .select("name")
-            .eq("class_name", selected_class)
-            .eq("roll_number", roll_number)
-            .execute()
-        )
+        locked_name = load_locked_name(supabase, selected_class, roll_number)
     except Exception:
         logger.exception("Failed to fetch roll map")
         st.error("Failed to check roll map.")
         return
 
-    if roll_map_response and roll_map_response.data:
-        locked_name = roll_map_response.data[0]["name"]
+    if locked_name:
         st.info(f"🔒 Name auto-filled for Roll {roll_number}: **{locked_name}**")
         name = locked_name
     else:
@@ -94,11 +118,18 @@ def show_student_panel():
     code_input = st.text_input("Attendance Code")
 
     if st.button("Submit Attendance"):
-        today = current_date()
+        today = clock.today()
 
-        if code_input != required_code:
+        # cheap rejections first: nothing below this reaches the database
+        # for throttled clients or a wrong code
+        code_ok = secrets.compare_digest(code_input.encode(), str(required_code).encode())
+        rejected = check_submit(client_key(), selected_class, code_ok)
+        if rejected == "bad_code":
             st.error("❌ Incorrect attendance code.")
             st.stop()
+        if rejected:
+            st.error("⏳ Too many attempts. Please wait a moment and try again.")
+            st.stop()
 
         try:
             existing_response = (
@@ -106,7 +137,7 @@ def show_student_panel():
                 .select("*")
                 .eq("class_name", selected_class)
                 .eq("roll_number", roll_number)
-                .eq("date", today)
+                .eq("day", today)
                 .execute()
             )
         except Exception:
@@ -125,7 +156,7 @@ def show_student_panel():
                 supabase.table("attendance")
                 .select("*", count="exact")
                 .eq("class_name", selected_class)
-                .eq("date", today)
+                .eq("day", today)
                 .execute()
             )
             attendance_count = attendance_today_response.count or 0
@@ -142,14 +173,15 @@ def show_student_panel():
 
         # lock roll number if first time
         try:
-            if not (roll_map_response and roll_map_response.data):
+            if not locked_name:
                 supabase.table("roll_map").insert({
                     "class_name": selected_class,
                     "roll_number": roll_number,
                     "name": name
                 }).execute()
+                get_cache().invalidate(roll_map_key(selected_class, roll_number))
             else:
-                if roll_map_response.data[0]["name"] != name:
+                if locked_name != name:
                     st.error("❌ Roll number already locked to a different name.")
                     st.stop()
                     return
@@ -165,10 +197,19 @@ def show_student_panel():
                 "class_name": selected_class,
                 "roll_number": roll_number,
                 "name": name,
-                "date": today
+                "day": today,
+                "date": day_to_iso(today)
             }).execute()
             st.success("Attendance submitted successfully!")
         except Exception:
             logger.exception("Failed to submit attendance")
             st.error("Failed to submit attendance.")
+            return
+
+        # raw row is the source of truth; a failed summary update can be
+        # repaired later with rebuild_summary
+        try:
+            record_submission(supabase, selected_class, roll_number, name, today)
+        except Exception:
+            logger.exception("Failed to update attendance summary")
 
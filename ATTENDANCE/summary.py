@@ -0,0 +1,204 @@
+#Attendance/summary.py
+
+"""
+Per-(class, roll) attendance summary.
+
+Every class keeps the ordered list of its session days (day ordinals,
+see clock.py) in classroom_settings.session_days. Each student gets one
+row in attendance_summary holding a bitset over that list (bit i set
+means present on session_days[i]) plus a present count, so a student's
+record is one key lookup instead of a pivot over raw rows.
+"""
+
+import threading
+from dataclasses import dataclass
+from .cache import get_cache, CLASS_SESSIONS
+from .lifecycle import iter_batches, run_in_background, BATCH_SIZE
+from .logger import get_log
+
+logger = get_log(__name__)
+
+# class_name -> RebuildJob, shared by every session in this process
+REBUILDS = {}
+_rebuilds_lock = threading.Lock()
+
+
+@dataclass
+class RebuildJob:
+    class_name: str
+    status: str = "pending"
+    students: int = 0
+    error: str | None = None
+
+    @property
+    def running(self):
+        return self.status not in ("done", "failed")
+
+
+def set_bit(bits_hex, index):
+    """
+    Return bits_hex (hex encoded bitset) with bit `index` set
+    """
+    bits = int(bits_hex or "0", 16)
+    return format(bits | (1 << index), "x")
+
+
+def decode_bits(bits_hex, sessions):
+    """
+    Expand a hex bitset into a list of "P"/"A" aligned with sessions
+    """
+    bits = int(bits_hex or "0", 16)
+    return ["P" if bits >> i & 1 else "A" for i in range(len(sessions))]
+
+
+def register_session(supabase, class_name, day):
+    """
+    Make sure `day` is one of the class's session days.
+    Returns its bit index. Session days are append only so
+    indexes stay stable for existing bitsets.
+    """
+    rows = (
+        supabase.table("classroom_settings")
+        .select("session_days")
+        .eq("class_name", class_name)
+        .execute()
+        .data
+    )
+    sessions = (rows[0].get("session_days") if rows else None) or []
+    if day in sessions:
+        return sessions.index(day)
+
+    sessions = sessions + [day]
+    supabase.table("classroom_settings").update({"session_days": sessions}).eq("class_name", class_name).execute()
+    get_cache().invalidate(CLASS_SESSIONS)
+    return len(sessions) - 1
+
+
+def fetch_summary(supabase, class_name, roll_number):
+    """
+    Returns the summary row for (class_name, roll_number) or None
+    """
+    rows = (
+        supabase.table("attendance_summary")
+        .select("*")
+        .eq("class_name", class_name)
+        .eq("roll_number", roll_number)
+        .execute()
+        .data
+    )
+    return rows[0] if rows else None
+
+
+def record_submission(supabase, class_name, roll_number, name, day):
+    """
+    Fold one accepted submission into the summary store
+    """
+    index = register_session(supabase, class_name, day)
+    current = fetch_summary(supabase, class_name, roll_number)
+    old_bits = current["present_bits"] if current else "0"
+    new_bits = set_bit(old_bits, index)
+    if new_bits == old_bits:
+        return
+
+    supabase.table("attendance_summary").upsert({
+        "class_name": class_name,
+        "roll_number": roll_number,
+        "name": name,
+        "present_bits": new_bits,
+        "present_count": bin(int(new_bits, 16)).count("1"),
+    }).execute()
+
+
+def rebuild_summary(supabase, class_name, batch_size=BATCH_SIZE):
+    """
+    Recompute session days and the summary rows of a class from the
+    raw attendance table, paging through it. Used to backfill or repair
+    the store. Missing days are appended through register_session, so
+    existing indexes stay put, and rebuilt bits are OR-ed into each
+    row's current present_bits right before the upsert, so a submission
+    recorded during the scan keeps its bit. Bits are never cleared.
+    Returns the number of summary rows written.
+    """
+    students = {}
+    for rows in iter_batches(supabase, class_name, batch_size):
+        for r in rows:
+            entry = students.setdefault(r["roll_number"], {"name": r["name"], "days": set()})
+            entry["days"].add(r["day"])
+
+    current = (
+        supabase.table("classroom_settings")
+        .select("session_days")
+        .eq("class_name", class_name)
+        .execute()
+        .data
+    )
+    sessions = (current[0].get("session_days") if current else None) or []
+    index = {day: i for i, day in enumerate(sessions)}
+    all_days = set().union(*(entry["days"] for entry in students.values()))
+    for day in sorted(all_days - set(sessions)):
+        index[day] = register_session(supabase, class_name, day)
+
+    rolls = list(students)
+    for start in range(0, len(rolls), batch_size):
+        chunk = rolls[start:start + batch_size]
+        existing = (
+            supabase.table("attendance_summary")
+            .select("roll_number", "present_bits")
+            .eq("class_name", class_name)
+            .in_("roll_number", chunk)
+            .execute()
+            .data
+        ) or []
+        bits_by_roll = {r["roll_number"]: int(r["present_bits"] or "0", 16) for r in existing}
+
+        rows = []
+        for roll in chunk:
+            entry = students[roll]
+            bits = bits_by_roll.get(roll, 0)
+            for day in entry["days"]:
+                bits |= 1 << index[day]
+            rows.append({
+                "class_name": class_name,
+                "roll_number": roll,
+                "name": entry["name"],
+                "present_bits": format(bits, "x"),
+                "present_count": bin(bits).count("1"),
+            })
+        supabase.table("attendance_summary").upsert(rows).execute()
+
+    logger.info(f"Rebuilt summary for {class_name}: {len(students)} students, {len(index)} sessions")
+    return len(students)
+
+
+def run_rebuild_job(supabase, job, batch_size=BATCH_SIZE):
+    try:
+        job.status = "rebuilding"
+        job.students = rebuild_summary(supabase, job.class_name, batch_size)
+        job.status = "done"
+    except Exception as e:
+        logger.exception(f"Failed to rebuild summary for {job.class_name}")
+        job.status = "failed"
+        job.error = str(e)
+    return job
+
+
+def is_rebuilding(class_name):
+    with _rebuilds_lock:
+        job = REBUILDS.get(class_name)
+        return job is not None and job.running
+
+
+def start_rebuild_job(supabase, class_name, scheduler=None):
+    """
+    Rebuild a class's summary in the background and return its RebuildJob.
+    An already running rebuild for the same class is returned as is.
+    """
+    with _rebuilds_lock:
+        job = REBUILDS.get(class_name)
+        if job and job.running:
+            return job
+        job = RebuildJob(class_name)
+        REBUILDS[class_name] = job
+
+    run_in_background(run_rebuild_job, (supabase, job), f"rebuild-{class_name}", scheduler)
+    return job
@@ -3,9 +3,7 @@ import streamlit as st
 from ATTENDANCE.student import show_student_panel
 import pandas as pd
 from ATTENDANCE.clients import create_supabase_client
-from datetime import datetime
 from ATTENDANCE.attendance_panel import show_attendance_panel
-import pytz
 
 st.set_page_config(
     page_title="Student Portal",
@@ -19,9 +17,6 @@ try:
 except Exception:
     supabase = None
 
-def current_ist_date():
-    return datetime.now(pytz.utc).strftime("%Y-%m-%d")
-
 st.markdown("""
 <h1 style='text-align: center; color: #4B8BBE;'>🎓 Student Attendance Portal</h1>
 <hr style='border-top: 1px solid #bbb;' />